@@ -2,9 +2,12 @@
 # Ejecuta con: python app.py
 # Requiere: pip install mysql-connector-python flask flask-cors
 
+import time
 import mysql.connector
 from flask import Flask, request, jsonify
 from flask_cors import CORS 
+from similarity import DEFAULT_THRESHOLD, find_similar
+from text_storage import hash_columns, load_texts, release_texts, store_columns
 
 app = Flask(__name__)
 CORS(app) 
@@ -30,6 +33,47 @@ def get_db_connection():
         print(f"Error al conectar a MySQL: {err}")
         return None
 
+# ----------------------------------------------------------------------
+# Feed de cambios (change_log)
+# ----------------------------------------------------------------------
+
+# Tablas que se publican en el feed de /changes
+CHANGE_FEED_TABLES = ['summaries', 'publications', 'items']
+CHANGES_DEFAULT_LIMIT = 100
+CHANGES_MAX_LIMIT = 1000
+CHANGES_MAX_WAIT = 30  # segundos máximos de long-polling
+
+def int_arg(name, default):
+    """Lee un parámetro entero de la query string. A diferencia de
+    request.args.get(type=int), que devuelve el default si el valor no es
+    entero, lanza ValueError para que la ruta responda 400."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"El parámetro '{name}' debe ser un entero") from None
+
+# ----------------------------------------------------------------------
+# Selección de campos (?fields=) y carga diferida de textos comprimidos
+# ----------------------------------------------------------------------
+
+SUMMARY_FIELDS = ['id', 'object_type', 'object_id', 'model', 'model_version', 'lang',
+                  'summary_text', 'confidence', 'created_at', 'created_by']
+
+def select_columns(table_name, allowed_fields, fields_arg):
+    """Retorna (columnas SQL, campos pedidos) según ?fields=a,b,c.
+    Sin ?fields se seleccionan todas. Lanza ValueError con campos inválidos."""
+    if not fields_arg:
+        return "*", None
+    fields = fields_arg.split(',')
+    invalid_fields = [f for f in fields if f not in allowed_fields]
+    if invalid_fields:
+        raise ValueError(f"Campos no soportados: {', '.join(invalid_fields)}")
+    # El texto comprimido se lee de text_blobs solo si se pidió la columna
+    return ", ".join(fields + hash_columns(table_name, fields)), fields
+
 # ----------------------------------------------------------------------
 # Rutas de la API (Endpoints CRUD)
 # ----------------------------------------------------------------------
@@ -48,6 +92,10 @@ def create_summary():
     if missing_fields:
         return jsonify({"message": f"Faltan campos obligatorios: {', '.join(missing_fields)}"}), 400
 
+    # summary_text admite NULL en la tabla (modo comprimido), pero no en la API
+    if not isinstance(data['summary_text'], str):
+        return jsonify({"message": "El campo 'summary_text' debe ser un texto"}), 400
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"message": "Error de conexión a la base de datos"}), 500
@@ -55,23 +103,23 @@ def create_summary():
     cursor = conn.cursor()
     
     # La consulta SQL incluye todos los campos, usando .get() para los opcionales
-    sql = """
-    INSERT INTO summaries (object_type, object_id, model, model_version, lang, summary_text, confidence, created_by)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    values = (
-        data['object_type'],
-        data['object_id'],
-        data['model'],
-        data.get('model_version'),
-        data.get('lang', 'es'), # Usa 'es' si no se provee
-        data['summary_text'],
-        data['confidence'],
-        data.get('created_by')
-    )
+    row = {
+        'object_type': data['object_type'],
+        'object_id': data['object_id'],
+        'model': data['model'],
+        'model_version': data.get('model_version'),
+        'lang': data.get('lang', 'es'), # Usa 'es' si no se provee
+        'summary_text': data['summary_text'],
+        'confidence': data['confidence'],
+        'created_by': data.get('created_by')
+    }
 
     try:
-        cursor.execute(sql, values)
+        # En modo comprimido summary_text se guarda en text_blobs
+        row = store_columns(cursor, 'summaries', row)
+        placeholders = ", ".join(["%s"] * len(row))
+        sql = f"INSERT INTO summaries ({', '.join(row)}) VALUES ({placeholders})"
+        cursor.execute(sql, tuple(row.values()))
         conn.commit()
         new_id = cursor.lastrowid
         return jsonify({"message": "Resumen creado exitosamente", "id": new_id}), 201
@@ -87,9 +135,14 @@ def create_summary():
 
 # ------------------------------------------------------
 # 2. READ (GET) - Obtener todos o uno
-# MUESTRA TODOS LOS CAMPOS
+# MUESTRA TODOS LOS CAMPOS, o solo los indicados en ?fields=id,model,...
 @app.route('/summaries', methods=['GET'])
 def get_summaries():
+    try:
+        columns, fields = select_columns('summaries', SUMMARY_FIELDS, request.args.get('fields'))
+    except ValueError as err:
+        return jsonify({"message": str(err)}), 400
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"message": "Error de conexión a la base de datos"}), 500
@@ -97,9 +150,9 @@ def get_summaries():
     cursor = conn.cursor(dictionary=True) # Retorna resultados como diccionarios
     
     try:
-        # SELECCIONA * para asegurar que todos los campos, incluido summary_text, se muestren
-        cursor.execute("SELECT * FROM summaries")
-        summaries = cursor.fetchall()
+        # Sin ?fields SELECCIONA * para que todos los campos, incluido summary_text, se muestren
+        cursor.execute(f"SELECT {columns} FROM summaries")
+        summaries = load_texts(cursor, 'summaries', cursor.fetchall(), fields)
         return jsonify(summaries), 200
     except mysql.connector.Error as err:
         return jsonify({"message": f"Error al leer resúmenes: {err}"}), 500
@@ -109,6 +162,11 @@ def get_summaries():
 
 @app.route('/summaries/<int:summary_id>', methods=['GET'])
 def get_summary(summary_id):
+    try:
+        columns, fields = select_columns('summaries', SUMMARY_FIELDS, request.args.get('fields'))
+    except ValueError as err:
+        return jsonify({"message": str(err)}), 400
+
     conn = get_db_connection()
     if not conn:
         return jsonify({"message": "Error de conexión a la base de datos"}), 500
@@ -116,11 +174,12 @@ def get_summary(summary_id):
     cursor = conn.cursor(dictionary=True)
 
     try:
-        # SELECCIONA * para asegurar que todos los campos se muestren
-        cursor.execute("SELECT * FROM summaries WHERE id = %s", (summary_id,))
+        # Sin ?fields SELECCIONA * para que todos los campos se muestren
+        cursor.execute(f"SELECT {columns} FROM summaries WHERE id = %s", (summary_id,))
         summary = cursor.fetchone()
         
         if summary:
+            load_texts(cursor, 'summaries', [summary], fields)
             return jsonify(summary), 200
         else:
             return jsonify({"message": "Resumen no encontrado"}), 404
@@ -144,27 +203,38 @@ def update_summary(summary_id):
     cursor = conn.cursor()
     
     # Construir la consulta de UPDATE dinámicamente con todos los campos actualizables
-    fields = []
-    values = []
-    
     updatable_fields = ['object_type', 'object_id', 'model', 'model_version', 'lang', 'summary_text', 'confidence', 'created_by']
     
-    for field in updatable_fields:
-        if field in data:
-            fields.append(f"{field} = %s")
-            values.append(data[field])
+    changes = {field: data[field] for field in updatable_fields if field in data}
         
-    if not fields:
+    if not changes:
         return jsonify({"message": "No se proporcionaron campos para actualizar"}), 400
 
-    sql = "UPDATE summaries SET " + ", ".join(fields) + " WHERE id = %s"
-    values.append(summary_id)
+    if 'summary_text' in changes and not isinstance(changes['summary_text'], str):
+        return jsonify({"message": "El campo 'summary_text' debe ser un texto"}), 400
 
     try:
+        old_hash = None
+        if 'summary_text' in changes and hash_columns('summaries'):
+            # Blob del texto anterior, para liberarlo si queda sin referencias
+            cursor.execute("SELECT summary_text_hash FROM summaries WHERE id = %s FOR UPDATE", (summary_id,))
+            row = cursor.fetchone()
+            old_hash = row[0] if row else None
+
+        # En modo comprimido summary_text se guarda en text_blobs
+        changes = store_columns(cursor, 'summaries', changes)
+        fields = [f"{field} = %s" for field in changes]
+        values = list(changes.values())
+
+        sql = "UPDATE summaries SET " + ", ".join(fields) + " WHERE id = %s"
+        values.append(summary_id)
+
         cursor.execute(sql, tuple(values))
+        updated = cursor.rowcount
+        release_texts(cursor, [old_hash])
         conn.commit()
         
-        if cursor.rowcount > 0:
+        if updated > 0:
             return jsonify({"message": f"Resumen con ID {summary_id} actualizado"}), 200
         else:
             return jsonify({"message": f"Resumen con ID {summary_id} no encontrado o sin cambios"}), 404
@@ -186,10 +256,18 @@ def delete_summary(summary_id):
     cursor = conn.cursor()
     
     try:
+        old_hash = None
+        if hash_columns('summaries'):
+            cursor.execute("SELECT summary_text_hash FROM summaries WHERE id = %s FOR UPDATE", (summary_id,))
+            row = cursor.fetchone()
+            old_hash = row[0] if row else None
         cursor.execute("DELETE FROM summaries WHERE id = %s", (summary_id,))
+        deleted = cursor.rowcount
+        # Sin este paso el texto borrado seguiría en text_blobs
+        release_texts(cursor, [old_hash])
         conn.commit()
         
-        if cursor.rowcount > 0:
+        if deleted > 0:
             return jsonify({"message": f"Resumen con ID {summary_id} eliminado exitosamente"}), 200
         else:
             return jsonify({"message": f"Resumen con ID {summary_id} no encontrado"}), 404
@@ -244,6 +322,134 @@ def share_summary(summary_id: int):
         "source_url": source_url.source_url
     }
 
+# ------------------------------------------------------
+# 6. READ (GET) - Feed de cambios para sincronización incremental
+# Devuelve los inserts/updates/deletes posteriores a ?since=<cursor>, en orden.
+# ?tables=summaries,publications,items filtra tablas; ?limit acota la página;
+# ?wait=<segundos> mantiene la petición abierta hasta que haya cambios.
+# El cursor es change_log.seq, asignado en orden de commit por change_sequencer.py;
+# este endpoint solo lee.
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    try:
+        since = int_arg('since', 0)
+        limit = int_arg('limit', CHANGES_DEFAULT_LIMIT)
+        wait = int_arg('wait', 0)
+    except ValueError as err:
+        return jsonify({"message": str(err)}), 400
+    tables_arg = request.args.get('tables')
+
+    tables = tables_arg.split(',') if tables_arg else CHANGE_FEED_TABLES
+    invalid_tables = [t for t in tables if t not in CHANGE_FEED_TABLES]
+    if invalid_tables:
+        return jsonify({"message": f"Tablas no soportadas: {', '.join(invalid_tables)}"}), 400
+    if since < 0 or limit < 1:
+        return jsonify({"message": "Parámetros 'since' o 'limit' inválidos"}), 400
+
+    limit = min(limit, CHANGES_MAX_LIMIT)
+    wait = max(0, min(wait, CHANGES_MAX_WAIT))
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"message": "Error de conexión a la base de datos"}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    # Se pide un registro extra para saber si hay más páginas
+    placeholders = ", ".join(["%s"] * len(tables))
+    sql = f"""
+    SELECT seq, table_name, row_id, op, changed_at
+    FROM change_log
+    WHERE seq > %s AND table_name IN ({placeholders})
+    ORDER BY seq
+    LIMIT %s
+    """
+
+    try:
+        deadline = time.monotonic() + wait
+        while True:
+            # Termina la transacción de lectura para ver los cambios que
+            # change_sequencer.py numeró mientras se esperaba
+            conn.commit()
+            cursor.execute(sql, (since, *tables, limit + 1))
+            changes = cursor.fetchall()
+            if changes or time.monotonic() >= deadline:
+                break
+            time.sleep(1)
+
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        # Adjunta el estado actual de las filas insertadas/actualizadas
+        ids_by_table = {}
+        for change in changes:
+            if change['op'] != 'delete':
+                ids_by_table.setdefault(change['table_name'], set()).add(change['row_id'])
+
+        rows = {}
+        for table_name, ids in ids_by_table.items():
+            id_placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"SELECT * FROM {table_name} WHERE id IN ({id_placeholders})", tuple(ids))
+            for row in load_texts(cursor, table_name, cursor.fetchall()):
+                rows[(table_name, row['id'])] = row
+
+        for change in changes:
+            change['cursor'] = change.pop('seq')
+            change['data'] = rows.get((change['table_name'], change['row_id']))
+
+        next_cursor = changes[-1]['cursor'] if changes else since
+        return jsonify({"changes": changes, "next_cursor": next_cursor, "has_more": has_more}), 200
+    except mysql.connector.Error as err:
+        return jsonify({"message": f"Error al leer cambios: {err}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
+# ------------------------------------------------------
+# 7. READ (GET) - Items casi duplicados (MinHash/LSH)
+# ?threshold=<0..1> similitud mínima estimada; ?limit acota el resultado.
+@app.route('/items/<int:item_id>/similar', methods=['GET'])
+def get_similar_items(item_id):
+    threshold = request.args.get('threshold', DEFAULT_THRESHOLD, type=float)
+    limit = request.args.get('limit', 20, type=int)
+
+    if not 0 <= threshold <= 1 or limit < 1:
+        return jsonify({"message": "Parámetros 'threshold' o 'limit' inválidos"}), 400
+
+    conn = get_db_connection()
+    if not conn:
+        return jsonify({"message": "Error de conexión a la base de datos"}), 500
+
+    cursor = conn.cursor(dictionary=True)
+
+    try:
+        matches = find_similar(cursor, 'item', item_id, threshold, min(limit, 100))
+        if matches is None:
+            return jsonify({"message": f"Item con ID {item_id} no encontrado o sin indexar"}), 404
+
+        # Agrega título y tipo de cada item similar. El índice no se limpia al
+        # borrar un item, así que se omiten los que ya no existen
+        if matches:
+            placeholders = ", ".join(["%s"] * len(matches))
+            cursor.execute(
+                f"SELECT id, title, item_type, reference_code FROM items WHERE id IN ({placeholders})",
+                tuple(m['object_id'] for m in matches)
+            )
+            items = {row['id']: row for row in cursor.fetchall()}
+            matches = [
+                {"item_id": m['object_id'], "similarity": m['similarity'], **{
+                    k: v for k, v in items[m['object_id']].items() if k != 'id'
+                }}
+                for m in matches if m['object_id'] in items
+            ]
+
+        return jsonify({"item_id": item_id, "threshold": threshold, "similar": matches}), 200
+    except mysql.connector.Error as err:
+        return jsonify({"message": f"Error al buscar items similares: {err}"}), 500
+    finally:
+        cursor.close()
+        conn.close()
+
 # ----------------------------------------------------------------------
 # Inicialización de la Aplicación
 # ----------------------------------------------------------------------
@@ -0,0 +1,103 @@
+# bench_similarity.py
+# Ejecuta con: python bench_similarity.py [num_documentos]
+# Mide precisión/recall y throughput del índice MinHash/LSH (similarity.py)
+# sobre un corpus sintético con casi duplicados al estilo del DOF.
+# Solo mide el índice en memoria (LSHIndex): no incluye index_document ni
+# find_similar contra MySQL, cuyo costo está dominado por las consultas.
+
+import random
+import sys
+import time
+
+from similarity import DEFAULT_THRESHOLD, LSHIndex, minhash, shingles
+
+VOCABULARIO = (
+    "decreto acuerdo aviso licitación secretaría hacienda crédito público ley reglamento "
+    "artículo fracción párrafo disposición federal diario oficial federación modifica "
+    "adiciona deroga reforma transitorio vigor publicación presente general nacional "
+    "estados unidos mexicanos poder ejecutivo congreso unión dependencia entidad "
+    "administración pública convocatoria pública nacional procedimiento contratación "
+    "servicios adquisición obra propuesta técnica económica fallo junta aclaraciones "
+    "fe de erratas dice debe decir página edición matutina vespertina extraordinaria "
+    "inversión fomento incentivos fiscales empresas pequeñas medianas contribuyentes "
+    "impuesto sobre renta valor agregado tasa cuota tarifa ejercicio fiscal anual"
+).split()
+
+def generar_documento(rng, palabras=300):
+    return [rng.choice(VOCABULARIO) for _ in range(palabras)]
+
+def mutar(rng, palabras, tasa):
+    """Cambia, inserta o elimina una fracción `tasa` de las palabras
+    (simula fe de erratas y republicaciones en Extra/Alcance)."""
+    resultado = list(palabras)
+    for _ in range(int(len(resultado) * tasa)):
+        i = rng.randrange(len(resultado))
+        operacion = rng.random()
+        if operacion < 0.6:
+            resultado[i] = rng.choice(VOCABULARIO)
+        elif operacion < 0.8:
+            resultado.insert(i, rng.choice(VOCABULARIO))
+        elif len(resultado) > 1:
+            del resultado[i]
+    return resultado
+
+def generar_corpus(num_documentos, seed=42):
+    """Mitad originales, mitad variantes con distintos niveles de edición."""
+    rng = random.Random(seed)
+    originales = [generar_documento(rng) for _ in range(num_documentos // 2)]
+    corpus = [' '.join(doc) for doc in originales]
+    while len(corpus) < num_documentos:
+        base = rng.choice(originales)
+        corpus.append(' '.join(mutar(rng, base, rng.choice([0.005, 0.01, 0.02, 0.05, 0.1, 0.3]))))
+    return corpus
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+def main():
+    num_documentos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threshold = DEFAULT_THRESHOLD
+    corpus = generar_corpus(num_documentos)
+
+    print(f"--- BENCHMARK MinHash/LSH: {num_documentos} documentos, umbral {threshold} ---")
+    print("(índice en memoria LSHIndex; no mide find_similar ni MySQL)")
+
+    inicio = time.perf_counter()
+    firmas = [minhash(texto) for texto in corpus]
+    t_firmas = time.perf_counter() - inicio
+
+    indice = LSHIndex()
+    inicio = time.perf_counter()
+    for doc_id, firma in enumerate(firmas):
+        indice.add(doc_id, firma)
+    t_indexado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    encontrados = set()
+    for doc_id, firma in enumerate(firmas):
+        for otro_id, _ in indice.query(firma, threshold):
+            if otro_id != doc_id:
+                encontrados.add((min(doc_id, otro_id), max(doc_id, otro_id)))
+    t_consultas = time.perf_counter() - inicio
+
+    # Verdad de referencia: Jaccard exacto sobre todos los pares
+    conjuntos = [shingles(texto) for texto in corpus]
+    reales = {
+        (i, j)
+        for i in range(num_documentos)
+        for j in range(i + 1, num_documentos)
+        if jaccard(conjuntos[i], conjuntos[j]) >= threshold
+    }
+
+    verdaderos = len(encontrados & reales)
+    precision = verdaderos / len(encontrados) if encontrados else 1.0
+    recall = verdaderos / len(reales) if reales else 1.0
+
+    print(f"Pares reales >= umbral: {len(reales)}  |  pares encontrados: {len(encontrados)}")
+    print(f"Precisión: {precision:.3f}  |  Recall: {recall:.3f}")
+    print(f"Firmas:    {num_documentos / t_firmas:,.0f} docs/s")
+    print(f"Indexado:  {num_documentos / t_indexado:,.0f} docs/s")
+    print(f"Consultas: {num_documentos / t_consultas:,.0f} consultas/s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# change_sequencer.py
+# Ejecuta con: python change_sequencer.py (en paralelo a app.py)
+# Requiere: pip install mysql-connector-python
+#
+# Asigna change_log.seq, el cursor de GET /changes, en orden de commit.
+# change_log.id se asigna al insertar y no sirve como cursor: una transacción
+# de ingesta abierta puede confirmar ids menores a otros ya entregados. Este
+# proceso numera solo las filas ya confirmadas; así GET /changes solo lee y
+# ningún consumidor puede pasar de largo un cambio.
+
+import time
+import mysql.connector
+
+# ----------------------------------------------------
+# 1. Configuración de Conexión
+# ----------------------------------------------------
+DB_CONFIG = {
+    "host": "127.0.0.1",
+    "user": "root",
+    "password": "contrasena",
+    "database": "dofdb",
+    "port": 3306
+}
+
+SEQUENCE_INTERVAL = 0.5  # segundos entre pasadas (latencia máxima del feed)
+SEQUENCE_BATCH = 5000    # cambios numerados por pasada
+
+# ----------------------------------------------------
+# 2. Numeración
+# ----------------------------------------------------
+
+def sequence_changes(conn):
+    """Asigna seq a los cambios confirmados y retorna cuántos numeró.
+
+    Se bloquea el contador (serializa a los numeradores) y SKIP LOCKED salta
+    las filas de transacciones aún abiertas, que recibirán un seq mayor cuando
+    se confirmen. La sesión usa READ COMMITTED para no bloquear huecos del
+    índice, y la numeración es un solo UPDATE para soltar los bloqueos pronto
+    y no frenar los INSERT de los triggers."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT value FROM change_log_seq WHERE id = 1 FOR UPDATE")
+        last_seq = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT id FROM change_log WHERE seq IS NULL ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED",
+            (SEQUENCE_BATCH,)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if ids:
+            placeholders = ", ".join(["%s"] * len(ids))
+            cursor.execute(f"""
+                UPDATE change_log c
+                JOIN (
+                    SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS n
+                    FROM change_log WHERE id IN ({placeholders})
+                ) r ON r.id = c.id
+                SET c.seq = %s + r.n
+            """, (*ids, last_seq))
+            cursor.execute("UPDATE change_log_seq SET value = %s WHERE id = 1", (last_seq + len(ids),))
+        conn.commit()
+        return len(ids)
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+# ----------------------------------------------------
+# 3. Ejecución
+# ----------------------------------------------------
+
+def main():
+    print("Numerador de change_log iniciado.")
+    conn = None
+    while True:
+        try:
+            if conn is None or not conn.is_connected():
+                conn = mysql.connector.connect(**DB_CONFIG)
+                conn.cursor().execute("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            # Si quedó un lote completo pendiente se sigue sin esperar
+            if sequence_changes(conn) < SEQUENCE_BATCH:
+                time.sleep(SEQUENCE_INTERVAL)
+        except mysql.connector.Error as err:
+            print(f"Error al numerar change_log: {err}")
+            conn = None
+            time.sleep(SEQUENCE_INTERVAL)
+
+if __name__ == '__main__':
+    main()
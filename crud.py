@@ -2,6 +2,8 @@
 import mysql.connector
 from datetime import datetime, timedelta
 import random
+from similarity import index_document, process_item
+from text_storage import store_columns
 
 # ----------------------------------------------------
 # 1. Configuración de Conexión
@@ -99,11 +101,13 @@ IDs['file_id'] = insert_record(
 )
 
 # 6. pages (Depende de files)
+# En modo comprimido text y tsv se guardan una sola vez en text_blobs
 page_text = "Texto de la página 1. Contiene la nueva Ley de Fomento a la Inversión."
+page_texts = store_columns(cursor, "pages", {"text": page_text, "tsv": page_text})
 IDs['page_id'] = insert_record(
     "pages",
-    ["file_id", "page_no", "text", "tsv", "image_uri", "checksum"],
-    [IDs['file_id'], 1, page_text, page_text, "s3://dof-images/p1.jpg", "chk-12345"]
+    ["file_id", "page_no", *page_texts, "image_uri", "checksum"],
+    [IDs['file_id'], 1, *page_texts.values(), "s3://dof-images/p1.jpg", "chk-12345"]
 )
 
 # 7. sections (Depende de publications)
@@ -115,9 +119,10 @@ IDs['section_id'] = insert_record(
 
 # 8. items (Depende de sections)
 raw_item_text = "DECRETO por el que se modifica la Ley de Inversión. Texto completo del artículo 1..."
+item_texts = store_columns(cursor, "items", {"raw_text": raw_item_text, "tsv": raw_item_text})
 IDs['item_id'] = insert_record(
     "items",
-    ["section_id", "item_type", "title", "issuing_entity", "reference_code", "page_from", "page_to", "raw_text", "tsv"],
+    ["section_id", "item_type", "title", "issuing_entity", "reference_code", "page_from", "page_to", *item_texts],
     [
         IDs['section_id'], 
         "Decreto", 
@@ -126,11 +131,21 @@ IDs['item_id'] = insert_record(
         "DOF-DECRETO-001", 
         3, 
         8, 
-        raw_item_text, 
-        raw_item_text
+        *item_texts.values()
     ]
 )
 
+# 8b. Índice de casi duplicados (MinHash/LSH) para la página y el item
+# El item pasa por process_item: si ya existe un casi duplicado con resúmenes,
+# se copian sus resultados en vez de repetir NLP y resumen
+if IDs['page_id'] and IDs['item_id']:
+    index_document(cursor, "page", IDs['page_id'], page_text)
+    source_item_id = process_item(cursor, IDs['item_id'], raw_item_text)
+    conn.commit()
+    print("  ✅ Firmas MinHash indexadas para la página y el item")
+    if source_item_id:
+        print(f"  ✅ Item casi duplicado de {source_item_id}: se reutilizaron sus resultados")
+
 # 9. entities
 IDs['entity_id'] = insert_record(
     "entities",
@@ -146,16 +161,19 @@ insert_record(
 )
 
 # 11. summaries (Depende de items y users)
+summary_texts = store_columns(cursor, "summaries", {
+    "summary_text": "Resumen del decreto: principal cambio en incentivos fiscales para PYMES."
+})
 IDs['summary_id'] = insert_record(
     "summaries",
-    ["object_type", "object_id", "model", "model_version", "lang", "summary_text", "confidence", "created_by"],
+    ["object_type", "object_id", "model", "model_version", "lang", *summary_texts, "confidence", "created_by"],
     [
         "item", 
         IDs['item_id'], 
         "Gemini-2.5-Pro", 
         "v2.5", 
         "es", 
-        "Resumen del decreto: principal cambio en incentivos fiscales para PYMES.", 
+        *summary_texts.values(), 
         0.995, 
         IDs['user_id']
     ]
@@ -87,10 +87,14 @@ CREATE TABLE pages (
   page_no INT NOT NULL,
   text MEDIUMTEXT,
   tsv MEDIUMTEXT,
+  text_hash CHAR(64) DEFAULT NULL,           -- text_blobs.sha256 (modo comprimido)
+  tsv_hash CHAR(64) DEFAULT NULL,
   image_uri TEXT,
   checksum VARCHAR(100) DEFAULT NULL,
   PRIMARY KEY (id),
-  UNIQUE KEY uq_pages_file_page (file_id, page_no)
+  UNIQUE KEY uq_pages_file_page (file_id, page_no),
+  KEY idx_pages_text_hash (text_hash),
+  KEY idx_pages_tsv_hash (tsv_hash)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- ------------------------------------------------------
@@ -122,8 +126,12 @@ CREATE TABLE items (
   page_to INT DEFAULT NULL,
   raw_text MEDIUMTEXT,
   tsv MEDIUMTEXT,
+  raw_text_hash CHAR(64) DEFAULT NULL,       -- text_blobs.sha256 (modo comprimido)
+  tsv_hash CHAR(64) DEFAULT NULL,
   ingested_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
-  PRIMARY KEY (id)
+  PRIMARY KEY (id),
+  KEY idx_items_raw_text_hash (raw_text_hash),
+  KEY idx_items_tsv_hash (tsv_hash)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- ------------------------------------------------------
@@ -148,11 +156,13 @@ CREATE TABLE summaries (
   model VARCHAR(100) NOT NULL,
   model_version VARCHAR(50) DEFAULT NULL,
   lang VARCHAR(10) DEFAULT NULL,
-  summary_text MEDIUMTEXT NOT NULL,
+  summary_text MEDIUMTEXT,                   -- NULL si está en text_blobs
+  summary_text_hash CHAR(64) DEFAULT NULL,
   confidence DECIMAL(5,4) DEFAULT NULL,
   created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
   created_by BIGINT DEFAULT NULL,
-  PRIMARY KEY (id)
+  PRIMARY KEY (id),
+  KEY idx_summaries_summary_text_hash (summary_text_hash)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
 -- ------------------------------------------------------
@@ -213,5 +223,115 @@ CREATE TABLE users (
   UNIQUE KEY uq_users_email (email)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
+-- ------------------------------------------------------
+-- Tabla: change_log (feed de cambios para sincronización incremental)
+-- ------------------------------------------------------
+DROP TABLE IF EXISTS change_log;
+-- id se asigna al insertar, pero la fila se vuelve visible al hacer commit:
+-- una transacción larga de ingesta puede confirmar ids menores que otros ya
+-- leídos. Por eso el cursor del feed no es id sino seq, que change_sequencer.py
+-- asigna en orden de commit en segundo plano. Requiere MySQL 8 (FOR UPDATE
+-- SKIP LOCKED y ROW_NUMBER).
+CREATE TABLE change_log (
+  id BIGINT NOT NULL AUTO_INCREMENT,
+  seq BIGINT DEFAULT NULL,                   -- cursor del feed (orden de commit)
+  table_name ENUM('summaries','publications','items') NOT NULL,
+  row_id BIGINT NOT NULL,
+  op ENUM('insert','update','delete') NOT NULL,
+  changed_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id),
+  UNIQUE KEY uq_change_log_seq (seq)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ------------------------------------------------------
+-- Tabla: change_log_seq (último seq asignado; una sola fila)
+-- ------------------------------------------------------
+DROP TABLE IF EXISTS change_log_seq;
+CREATE TABLE change_log_seq (
+  id TINYINT NOT NULL,
+  value BIGINT NOT NULL,
+  PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+INSERT INTO change_log_seq (id, value) VALUES (1, 0);
+
+-- Los cambios se registran con triggers para que los escritos por el
+-- pipeline de ingesta (no solo los de la API) lleguen al feed.
+-- Un proceso de mantenimiento que no cambia el contenido (p. ej.
+-- migrate_text_storage.py) puede ejecutar SET @skip_change_log = 1 para no
+-- publicar sus UPDATE en el feed.
+DELIMITER //
+CREATE TRIGGER trg_publications_ins AFTER INSERT ON publications FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'publications', NEW.id, 'insert' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_publications_upd AFTER UPDATE ON publications FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'publications', NEW.id, 'update' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_publications_del AFTER DELETE ON publications FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'publications', OLD.id, 'delete' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_items_ins AFTER INSERT ON items FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'items', NEW.id, 'insert' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_items_upd AFTER UPDATE ON items FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'items', NEW.id, 'update' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_items_del AFTER DELETE ON items FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'items', OLD.id, 'delete' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_summaries_ins AFTER INSERT ON summaries FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'summaries', NEW.id, 'insert' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_summaries_upd AFTER UPDATE ON summaries FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'summaries', NEW.id, 'update' FROM DUAL WHERE @skip_change_log IS NULL//
+CREATE TRIGGER trg_summaries_del AFTER DELETE ON summaries FOR EACH ROW
+  INSERT INTO change_log (table_name, row_id, op) SELECT 'summaries', OLD.id, 'delete' FROM DUAL WHERE @skip_change_log IS NULL//
+DELIMITER ;
+
+-- ------------------------------------------------------
+-- Tabla: minhash_signatures (firmas MinHash de items.raw_text y pages.text)
+-- ------------------------------------------------------
+DROP TABLE IF EXISTS minhash_signatures;
+CREATE TABLE minhash_signatures (
+  object_type ENUM('item','page') NOT NULL,
+  object_id BIGINT NOT NULL,
+  signature VARBINARY(512) NOT NULL,         -- 128 enteros uint32 (similarity.py)
+  indexed_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (object_type, object_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ------------------------------------------------------
+-- Tabla: lsh_buckets (bandas LSH para buscar candidatos casi duplicados)
+-- ------------------------------------------------------
+DROP TABLE IF EXISTS lsh_buckets;
+CREATE TABLE lsh_buckets (
+  object_type ENUM('item','page') NOT NULL,
+  band TINYINT UNSIGNED NOT NULL,
+  bucket CHAR(16) NOT NULL,
+  object_id BIGINT NOT NULL,
+  PRIMARY KEY (object_type, band, bucket, object_id),
+  KEY idx_lsh_buckets_object (object_type, object_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ------------------------------------------------------
+-- Tabla: compression_dicts (diccionarios entrenados para texto legal del DOF)
+-- ------------------------------------------------------
+DROP TABLE IF EXISTS compression_dicts;
+CREATE TABLE compression_dicts (
+  id BIGINT NOT NULL AUTO_INCREMENT,
+  codec ENUM('zlib','zstd') NOT NULL,
+  data MEDIUMBLOB NOT NULL,
+  created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- ------------------------------------------------------
+-- Tabla: text_blobs (textos grandes comprimidos, direccionados por sha256)
+-- Un blob se borra cuando ninguna columna <col>_hash lo referencia
+-- (text_storage.release_texts / migrate_text_storage.py --gc).
+-- ------------------------------------------------------
+DROP TABLE IF EXISTS text_blobs;
+CREATE TABLE text_blobs (
+  sha256 CHAR(64) NOT NULL,
+  codec ENUM('none','zlib','zstd') NOT NULL,
+  dict_id BIGINT DEFAULT NULL,               -- compression_dicts.id
+  raw_bytes INT NOT NULL,
+  data LONGBLOB NOT NULL,
+  created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (sha256)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
 SET FOREIGN_KEY_CHECKS=1;
 /*!40111 SET SQL_NOTES=@OLD_SQL_NOTES */;
@@ -0,0 +1,293 @@
+# migrate_text_storage.py
+# Ejecuta con: python migrate_text_storage.py [--train] [--report] [--gc] [--batch-size 500]
+# Requiere: pip install mysql-connector-python (opcional: zstandard)
+#
+# Convierte por lotes las columnas de texto grandes (pages.text/tsv,
+# items.raw_text/tsv, summaries.summary_text) al almacenamiento comprimido de
+# text_storage.py. Antes de migrar, cambia TEXT_STORAGE_MODE a 'compressed'
+# para que las escrituras nuevas ya no se guarden en línea.
+#
+# Mover el texto a text_blobs no cambia el contenido, así que la sesión activa
+# @skip_change_log y los triggers de change_log no publican estos UPDATE en
+# GET /changes.
+
+import argparse
+import random
+import time
+import mysql.connector
+
+import text_storage
+from text_storage import (TEXT_COLUMNS, collect_orphan_blobs, load_texts, put_text,
+                          save_dictionary, train_dictionary)
+
+# ----------------------------------------------------
+# 1. Configuración de Conexión
+# ----------------------------------------------------
+DB_CONFIG = {
+    "host": "127.0.0.1",
+    "user": "root",
+    "password": "contrasena",
+    "database": "dofdb",
+    "port": 3306
+}
+
+REPORT_SAMPLE_SIZE = 200
+TRAIN_SAMPLE_SIZE = 2000
+
+# ----------------------------------------------------
+# 2. Esquema (idempotente, para bases creadas antes de text_blobs)
+# ----------------------------------------------------
+
+def ensure_schema(cursor):
+    """Crea text_blobs/compression_dicts y las columnas <col>_hash si faltan."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS compression_dicts (
+          id BIGINT NOT NULL AUTO_INCREMENT,
+          codec ENUM('zlib','zstd') NOT NULL,
+          data MEDIUMBLOB NOT NULL,
+          created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS text_blobs (
+          sha256 CHAR(64) NOT NULL,
+          codec ENUM('none','zlib','zstd') NOT NULL,
+          dict_id BIGINT DEFAULT NULL,
+          raw_bytes INT NOT NULL,
+          data LONGBLOB NOT NULL,
+          created_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+          PRIMARY KEY (sha256)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """)
+
+    for table_name, columns in TEXT_COLUMNS.items():
+        for column in columns:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+            """, (table_name, f"{column}_hash"))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(
+                    f"ALTER TABLE {table_name} ADD COLUMN {column}_hash CHAR(64) DEFAULT NULL AFTER {column}"
+                )
+                print(f"  ✅ Columna {table_name}.{column}_hash agregada")
+
+            # Índice para comprobar referencias al liberar blobs
+            index_name = f"idx_{table_name}_{column}_hash"
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            """, (table_name, index_name))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(f"ALTER TABLE {table_name} ADD KEY {index_name} ({column}_hash)")
+                print(f"  ✅ Índice {index_name} agregado")
+
+    # summary_text queda en NULL cuando el texto vive en text_blobs
+    cursor.execute("ALTER TABLE summaries MODIFY summary_text MEDIUMTEXT NULL")
+
+# ----------------------------------------------------
+# 3. Entrenamiento del diccionario
+# ----------------------------------------------------
+
+def train(cursor, sample_size=TRAIN_SAMPLE_SIZE):
+    """Entrena un diccionario con una muestra de los textos actuales del DOF."""
+    samples = []
+    per_table = sample_size // len(TEXT_COLUMNS)
+    for table_name, columns in TEXT_COLUMNS.items():
+        # tsv repite el texto: basta con la primera columna de cada tabla
+        column = columns[0]
+        cursor.execute(
+            f"SELECT {column} FROM {table_name} WHERE {column} IS NOT NULL ORDER BY RAND() LIMIT %s",
+            (per_table,)
+        )
+        samples.extend(row[0] for row in cursor.fetchall())
+
+    if not samples:
+        print("  ⚠️ No hay textos en línea para entrenar el diccionario")
+        return None
+    dictionary = train_dictionary(samples)
+    dict_id = save_dictionary(cursor, dictionary)
+    print(f"  ✅ Diccionario {text_storage.CODEC} #{dict_id} entrenado con {len(samples)} textos ({len(dictionary)} bytes)")
+    return dict_id
+
+# ----------------------------------------------------
+# 4. Migración por lotes
+# ----------------------------------------------------
+
+def migrate_table(conn, cursor, table_name, batch_size):
+    """Mueve los textos en línea de la tabla a text_blobs, un lote por transacción.
+
+    El lote se lee con FOR UPDATE dentro de su transacción: la API sigue
+    escribiendo durante la migración y, sin el bloqueo, un PUT confirmado entre
+    la lectura y el UPDATE se perdería bajo el hash del texto anterior."""
+    columns = TEXT_COLUMNS[table_name]
+    pending = " OR ".join(f"{c} IS NOT NULL" for c in columns)
+    sql = (f"SELECT id, {', '.join(columns)} FROM {table_name} "
+           f"WHERE id > %s AND ({pending}) ORDER BY id LIMIT %s FOR UPDATE")
+    # Una columna ya migrada (texto NULL) conserva su hash
+    assignments = ", ".join(f"{c} = NULL, {c}_hash = COALESCE(%s, {c}_hash)" for c in columns)
+    update_sql = f"UPDATE {table_name} SET {assignments} WHERE id = %s"
+
+    last_id = 0
+    migrated = 0
+    while True:
+        try:
+            cursor.execute(sql, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                conn.commit()
+                break
+            for row_id, *texts in rows:
+                # tsv suele repetir el texto: se comprime una vez por fila
+                stored = {text: put_text(cursor, text) for text in set(texts)}
+                cursor.execute(update_sql, (*(stored[text] for text in texts), row_id))
+            conn.commit()
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"  ❌ Error al migrar '{table_name}' después del ID {last_id}: {err}")
+            return migrated
+        last_id = rows[-1][0]
+        migrated += len(rows)
+        print(f"  ... {table_name}: {migrated} filas migradas (último ID {last_id})")
+
+    print(f"  ✅ {table_name}: {migrated} filas migradas")
+    return migrated
+
+# ----------------------------------------------------
+# 5. Limpieza de blobs sin referencias
+# ----------------------------------------------------
+
+def gc_blobs(conn, cursor, batch_size):
+    """Borra los blobs que ya no referencia ninguna fila, un lote por transacción."""
+    after = ''
+    collected = 0
+    while after is not None:
+        try:
+            released, after = collect_orphan_blobs(cursor, after, batch_size)
+            conn.commit()
+        except mysql.connector.Error as err:
+            conn.rollback()
+            print(f"  ❌ Error al limpiar text_blobs: {err}")
+            break
+        collected += released
+    print(f"  ✅ text_blobs: {collected} blobs sin referencias borrados")
+    return collected
+
+# ----------------------------------------------------
+# 6. Reporte de tamaño y latencia de lectura
+# ----------------------------------------------------
+
+def report(conn, label):
+    """Imprime el tamaño de las tablas y la latencia media de lectura por fila,
+    con y sin las columnas de texto."""
+    cursor = conn.cursor()
+    tables = [*TEXT_COLUMNS, 'text_blobs']
+    cursor.execute(f"ANALYZE TABLE {', '.join(tables)}")
+    cursor.fetchall()
+    placeholders = ", ".join(["%s"] * len(tables))
+    cursor.execute(f"""
+        SELECT TABLE_NAME, DATA_LENGTH + INDEX_LENGTH
+        FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+    """, tuple(tables))
+    sizes = dict(cursor.fetchall())
+
+    print(f"\n--- REPORTE: {label} ---")
+    print(f"{'tabla':<12} {'tamaño (KB)':>12} {'lectura completa (ms/fila)':>28} {'sin texto (ms/fila)':>20}")
+
+    dict_cursor = conn.cursor(dictionary=True)
+    for table_name in tables:
+        size_kb = (sizes.get(table_name) or 0) / 1024
+        if table_name == 'text_blobs':
+            print(f"{table_name:<12} {size_kb:>12,.0f}")
+            continue
+
+        cursor.execute(f"SELECT id FROM {table_name}")
+        ids = [row[0] for row in cursor.fetchall()]
+        ids = random.sample(ids, min(len(ids), REPORT_SAMPLE_SIZE))
+        if not ids:
+            print(f"{table_name:<12} {size_kb:>12,.0f} {'-':>28} {'-':>20}")
+            continue
+
+        text_columns = TEXT_COLUMNS[table_name] + [f"{c}_hash" for c in TEXT_COLUMNS[table_name]]
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+        cursor.fetchall()
+        light_columns = [c for c in cursor.column_names if c not in text_columns]
+
+        start = time.perf_counter()
+        for row_id in ids:
+            dict_cursor.execute(f"SELECT * FROM {table_name} WHERE id = %s", (row_id,))
+            load_texts(dict_cursor, table_name, dict_cursor.fetchall())
+        full_ms = (time.perf_counter() - start) * 1000 / len(ids)
+
+        start = time.perf_counter()
+        for row_id in ids:
+            dict_cursor.execute(f"SELECT {', '.join(light_columns)} FROM {table_name} WHERE id = %s", (row_id,))
+            dict_cursor.fetchall()
+        light_ms = (time.perf_counter() - start) * 1000 / len(ids)
+
+        print(f"{table_name:<12} {size_kb:>12,.0f} {full_ms:>28.3f} {light_ms:>20.3f}")
+
+    cursor.close()
+    dict_cursor.close()
+
+# ----------------------------------------------------
+# 7. Ejecución
+# ----------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra textos grandes a almacenamiento comprimido")
+    parser.add_argument("--batch-size", type=int, default=500, help="filas por transacción")
+    parser.add_argument("--train", action="store_true", help="entrena un diccionario antes de migrar")
+    parser.add_argument("--report", action="store_true", help="reporta tamaño y latencia antes y después")
+    parser.add_argument("--gc", action="store_true", help="borra los blobs sin referencias")
+    args = parser.parse_args()
+
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+    except mysql.connector.Error as err:
+        print(f"Error al conectar con MySQL: {err}")
+        return
+    cursor = conn.cursor(buffered=True)
+    # Los UPDATE de la migración no deben aparecer en el feed de cambios
+    cursor.execute("SET @skip_change_log = 1")
+
+    print("--- MIGRACIÓN A ALMACENAMIENTO COMPRIMIDO ---")
+    ensure_schema(cursor)
+    conn.commit()
+
+    if args.report:
+        report(conn, "antes de migrar")
+
+    if args.train:
+        train(cursor)
+        conn.commit()
+
+    changed_tables = [
+        table_name for table_name in TEXT_COLUMNS
+        if migrate_table(conn, cursor, table_name, args.batch_size)
+    ]
+
+    collected = gc_blobs(conn, cursor, args.batch_size) if args.gc else 0
+
+    # Recupera el espacio liberado por las columnas en línea y los blobs
+    # borrados. OPTIMIZE reconstruye la tabla completa, así que solo se corre
+    # sobre las tablas que cambiaron en esta ejecución.
+    if changed_tables or collected:
+        changed_tables.append('text_blobs')
+    if changed_tables:
+        cursor.execute(f"OPTIMIZE TABLE {', '.join(changed_tables)}")
+        cursor.fetchall()
+
+    if args.report:
+        report(conn, "después de migrar")
+
+    if text_storage.TEXT_STORAGE_MODE != 'compressed':
+        print("\n⚠️ TEXT_STORAGE_MODE sigue en 'inline': las escrituras nuevas no se comprimirán.")
+
+    cursor.close()
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+# similarity.py
+# Índice MinHash/LSH para detectar textos casi duplicados (items.raw_text, pages.text).
+# Solo usa la biblioteca estándar; las tablas están en dofdb_estructura.sql.
+
+import hashlib
+import re
+import struct
+import unicodedata
+
+from text_storage import hash_columns
+
+# ----------------------------------------------------------------------
+# Parámetros de MinHash/LSH
+# ----------------------------------------------------------------------
+
+NUM_PERM = 128            # tamaño de la firma MinHash
+LSH_BANDS = 16            # bandas * filas = NUM_PERM
+LSH_ROWS = NUM_PERM // LSH_BANDS
+SHINGLE_SIZE = 5          # shingles de 5 palabras
+DEFAULT_THRESHOLD = 0.8   # Jaccard estimado mínimo para considerar duplicado
+
+_SIGNATURE_STRUCT = struct.Struct(f'<{NUM_PERM}I')
+
+# ----------------------------------------------------------------------
+# Firmas
+# ----------------------------------------------------------------------
+
+def normalize_text(text):
+    """Minúsculas, sin acentos ni puntuación y con espacios colapsados."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r'\w+', text.lower())
+
+def shingles(text, k=SHINGLE_SIZE):
+    """Conjunto de k-gramas de palabras del texto normalizado."""
+    words = normalize_text(text)
+    if len(words) < k:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def minhash(text):
+    """Calcula la firma MinHash (lista de NUM_PERM enteros) de un texto.
+
+    Cada shingle se hashea una sola vez con SHAKE-128 para obtener NUM_PERM
+    valores de 32 bits independientes; la firma es el mínimo por posición.
+    Es varias veces más rápido que aplicar NUM_PERM permutaciones en Python.
+
+    Retorna None si el texto no tiene palabras (p. ej. OCR vacío): una firma
+    constante haría a todos esos textos duplicados entre sí."""
+    grams = shingles(text)
+    if not grams:
+        return None
+    digest_size = _SIGNATURE_STRUCT.size
+    rows = [
+        _SIGNATURE_STRUCT.unpack(hashlib.shake_128(g.encode('utf-8')).digest(digest_size))
+        for g in grams
+    ]
+    return list(map(min, zip(*rows)))
+
+def estimate_jaccard(sig_a, sig_b):
+    """Fracción de posiciones iguales entre dos firmas (estimador de Jaccard)."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+def band_hashes(signature):
+    """Devuelve un hash hexadecimal por banda LSH de la firma."""
+    result = []
+    for band in range(LSH_BANDS):
+        chunk = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        data = struct.pack(f'<{LSH_ROWS}I', *chunk)
+        result.append(hashlib.blake2b(data, digest_size=8).hexdigest())
+    return result
+
+def pack_signature(signature):
+    """Serializa la firma para la columna BLOB."""
+    return _SIGNATURE_STRUCT.pack(*signature)
+
+def unpack_signature(data):
+    return list(_SIGNATURE_STRUCT.unpack(bytes(data)))
+
+# ----------------------------------------------------------------------
+# Índice en memoria (benchmarks y procesamiento por lotes)
+# ----------------------------------------------------------------------
+
+class LSHIndex:
+    """Índice LSH en memoria con la misma lógica que las tablas de MySQL."""
+
+    def __init__(self):
+        self.signatures = {}
+        self.buckets = [{} for _ in range(LSH_BANDS)]
+
+    def add(self, key, signature):
+        if signature is None:
+            return
+        self.signatures[key] = signature
+        for band, bucket in enumerate(band_hashes(signature)):
+            self.buckets[band].setdefault(bucket, []).append(key)
+
+    def query(self, signature, threshold=DEFAULT_THRESHOLD):
+        """Retorna [(key, similitud)] ordenado de mayor a menor similitud."""
+        if signature is None:
+            return []
+        candidates = set()
+        for band, bucket in enumerate(band_hashes(signature)):
+            candidates.update(self.buckets[band].get(bucket, ()))
+        matches = []
+        for key in candidates:
+            score = estimate_jaccard(signature, self.signatures[key])
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+# ----------------------------------------------------------------------
+# Índice persistente en MySQL
+# ----------------------------------------------------------------------
+
+def index_document(cursor, object_type, object_id, text):
+    """Calcula e indexa la firma de un item o página después de insertar su
+    texto; el commit lo hace quien llama. Retorna None (y quita la firma
+    anterior) si el texto no tiene palabras, para no emparejarlo con nada."""
+    signature = minhash(text)
+    cursor.execute(
+        "DELETE FROM lsh_buckets WHERE object_type = %s AND object_id = %s",
+        (object_type, object_id)
+    )
+    if signature is None:
+        cursor.execute(
+            "DELETE FROM minhash_signatures WHERE object_type = %s AND object_id = %s",
+            (object_type, object_id)
+        )
+        return None
+    cursor.execute(
+        "REPLACE INTO minhash_signatures (object_type, object_id, signature) VALUES (%s, %s, %s)",
+        (object_type, object_id, pack_signature(signature))
+    )
+    cursor.executemany(
+        "INSERT INTO lsh_buckets (object_type, band, bucket, object_id) VALUES (%s, %s, %s, %s)",
+        [(object_type, band, bucket, object_id) for band, bucket in enumerate(band_hashes(signature))]
+    )
+    return signature
+
+def find_similar(cursor, object_type, object_id, threshold=DEFAULT_THRESHOLD, limit=20):
+    """Busca documentos del mismo tipo con similitud estimada >= threshold.
+    Retorna None si el documento no está indexado."""
+    cursor.execute(
+        "SELECT signature FROM minhash_signatures WHERE object_type = %s AND object_id = %s",
+        (object_type, object_id)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    signature = unpack_signature(row[0] if isinstance(row, tuple) else row['signature'])
+
+    # Candidatos: documentos que comparten al menos una banda
+    cursor.execute("""
+        SELECT DISTINCT s.object_id, s.signature
+        FROM lsh_buckets b
+        JOIN lsh_buckets c
+            ON c.object_type = b.object_type AND c.band = b.band AND c.bucket = b.bucket
+        JOIN minhash_signatures s
+            ON s.object_type = c.object_type AND s.object_id = c.object_id
+        WHERE b.object_type = %s AND b.object_id = %s AND c.object_id <> b.object_id
+    """, (object_type, object_id))
+
+    matches = []
+    for candidate in cursor.fetchall():
+        if isinstance(candidate, tuple):
+            candidate_id, candidate_sig = candidate
+        else:
+            candidate_id, candidate_sig = candidate['object_id'], candidate['signature']
+        score = estimate_jaccard(signature, unpack_signature(candidate_sig))
+        if score >= threshold:
+            matches.append({"object_id": candidate_id, "similarity": round(score, 4)})
+    matches.sort(key=lambda m: m['similarity'], reverse=True)
+    return matches[:limit]
+
+def reuse_item_results(cursor, source_item_id, target_item_id):
+    """Copia summaries e item_entities de un item casi duplicado ya procesado
+    para que el pipeline no repita NLP ni resumen. Retorna los IDs de los
+    resúmenes creados ([] si el item destino ya tenía resúmenes, p. ej. al
+    reprocesarlo)."""
+    cursor.execute("""
+        INSERT IGNORE INTO item_entities (item_id, entity_id, evidence_span)
+        SELECT %s, entity_id, evidence_span FROM item_entities WHERE item_id = %s
+    """, (target_item_id, source_item_id))
+
+    cursor.execute(
+        "SELECT 1 FROM summaries WHERE object_type = 'item' AND object_id = %s LIMIT 1 FOR UPDATE",
+        (target_item_id,)
+    )
+    if cursor.fetchall():
+        return []
+
+    # FOR SHARE: mientras no se confirme la copia, nadie puede borrar los
+    # resúmenes origen ni (release_texts) el blob al que apunta summary_text_hash
+    columns = ['model', 'model_version', 'lang', 'summary_text', *hash_columns('summaries'), 'confidence', 'created_by']
+    cursor.execute(
+        f"SELECT {', '.join(columns)} FROM summaries WHERE object_type = 'item' AND object_id = %s FOR SHARE",
+        (source_item_id,)
+    )
+    new_ids = []
+    for summary in cursor.fetchall():
+        # Funciona con cursores normales y con dictionary=True
+        if isinstance(summary, tuple):
+            summary = dict(zip(columns, summary))
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.execute(
+            f"INSERT INTO summaries (object_type, object_id, {', '.join(columns)}) VALUES ('item', %s, {placeholders})",
+            (target_item_id, *(summary[c] for c in columns))
+        )
+        new_ids.append(cursor.lastrowid)
+    return new_ids
+
+def process_item(cursor, item_id, raw_text, threshold=DEFAULT_THRESHOLD):
+    """Indexa un item recién ingerido y, si existe un casi duplicado con
+    resúmenes, reutiliza sus resultados. Retorna el ID del item origen o None
+    si el item debe pasar por el pipeline completo."""
+    if index_document(cursor, 'item', item_id, raw_text) is None:
+        return None
+    for match in find_similar(cursor, 'item', item_id, threshold) or []:
+        cursor.execute(
+            "SELECT 1 FROM summaries WHERE object_type = 'item' AND object_id = %s LIMIT 1",
+            (match['object_id'],)
+        )
+        if cursor.fetchone():
+            reuse_item_results(cursor, match['object_id'], item_id)
+            return match['object_id']
+    return None
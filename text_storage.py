@@ -0,0 +1,271 @@
+# text_storage.py
+# Almacenamiento comprimido de columnas de texto grandes (pages.text/tsv,
+# items.raw_text/tsv, summaries.summary_text).
+# Opcional: pip install zstandard (si no está instalado se usa zlib con diccionario)
+#
+# En modo 'compressed' el texto se guarda una sola vez en text_blobs, indexado
+# por su sha256, y la fila solo guarda el hash (<columna>_hash). Como tsv repite
+# el texto, ambas columnas apuntan al mismo blob.
+
+import hashlib
+import zlib
+from collections import Counter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# ----------------------------------------------------------------------
+# Configuración
+# ----------------------------------------------------------------------
+
+# 'inline': el texto se escribe en la propia columna (comportamiento original)
+# 'compressed': el texto se escribe en text_blobs y la columna queda en NULL
+TEXT_STORAGE_MODE = 'inline'
+
+# Columnas de texto grandes por tabla; cada una tiene su columna <col>_hash
+TEXT_COLUMNS = {
+    'pages': ['text', 'tsv'],
+    'items': ['raw_text', 'tsv'],
+    'summaries': ['summary_text'],
+}
+
+CODEC = 'zstd' if zstandard else 'zlib'
+DICT_SIZE = 112640 if zstandard else 32768  # zlib no usa más de 32 KB de diccionario
+
+# Cache de diccionarios por id: {dict_id: (codec, bytes)}
+_dictionaries = {}
+# Diccionario activo por codec: {codec: (dict_id, bytes)}. Se carga una vez por
+# proceso y solo cambia con save_dictionary; otros procesos ven un diccionario
+# nuevo al reiniciarse (los blobs guardan su dict_id, así que ambos se leen).
+_active = {}
+
+# ----------------------------------------------------------------------
+# Compresión
+# ----------------------------------------------------------------------
+
+def compress(data, codec, dictionary=None):
+    if codec == 'zstd':
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=9, dict_data=zdict).compress(data)
+    if codec == 'zlib':
+        compressor = zlib.compressobj(9, zdict=dictionary) if dictionary else zlib.compressobj(9)
+        return compressor.compress(data) + compressor.flush()
+    return data
+
+def decompress(data, codec, dictionary=None):
+    if codec == 'zstd':
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=zdict).decompress(data)
+    if codec == 'zlib':
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+    return data
+
+def train_dictionary(samples, size=DICT_SIZE):
+    """Entrena un diccionario a partir de textos de muestra (str).
+
+    Con zstandard se usa su entrenador. Para zlib se concatenan los fragmentos
+    de 4 palabras más frecuentes, dejando los más comunes al final del
+    diccionario, que es donde zlib los referencia con distancias más cortas."""
+    if zstandard:
+        encoded = [s.encode('utf-8') for s in samples if s]
+        return zstandard.train_dictionary(size, encoded).as_bytes()
+
+    counts = Counter()
+    for sample in samples:
+        words = (sample or '').split()
+        counts.update(' '.join(words[i:i + 4]) for i in range(0, len(words) - 3, 2))
+
+    fragments = []
+    total = 0
+    for fragment, count in counts.most_common():
+        if count < 2:
+            break
+        encoded = (fragment + ' ').encode('utf-8')
+        if total + len(encoded) > size:
+            break
+        fragments.append(encoded)
+        total += len(encoded)
+    return b''.join(reversed(fragments))
+
+# ----------------------------------------------------------------------
+# Diccionarios (tabla compression_dicts)
+# ----------------------------------------------------------------------
+
+def save_dictionary(cursor, data, codec=CODEC):
+    """Guarda un diccionario nuevo; los blobs nuevos lo usarán a partir de ahora."""
+    cursor.execute("INSERT INTO compression_dicts (codec, data) VALUES (%s, %s)", (codec, data))
+    _dictionaries[cursor.lastrowid] = (codec, data)
+    _active[codec] = (cursor.lastrowid, data)
+    return cursor.lastrowid
+
+def _active_dictionary(cursor, codec):
+    """Retorna (dict_id, bytes) del diccionario más reciente para el codec."""
+    if codec in _active:
+        return _active[codec]
+    cursor.execute(
+        "SELECT id, data FROM compression_dicts WHERE codec = %s ORDER BY id DESC LIMIT 1",
+        (codec,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        _active[codec] = (None, None)
+    else:
+        dict_id, data = (row['id'], row['data']) if isinstance(row, dict) else row
+        _dictionaries[dict_id] = (codec, bytes(data))
+        _active[codec] = (dict_id, bytes(data))
+    return _active[codec]
+
+def _get_dictionary(cursor, dict_id):
+    if dict_id not in _dictionaries:
+        cursor.execute("SELECT codec, data FROM compression_dicts WHERE id = %s", (dict_id,))
+        row = cursor.fetchone()
+        codec, data = (row['codec'], row['data']) if isinstance(row, dict) else row
+        _dictionaries[dict_id] = (codec, bytes(data))
+    return _dictionaries[dict_id][1]
+
+# ----------------------------------------------------------------------
+# Escritura y lectura de blobs
+# ----------------------------------------------------------------------
+
+def put_text(cursor, text):
+    """Guarda el texto comprimido en text_blobs (si no existe ya) y retorna su sha256.
+
+    No se consulta antes si el blob existe: INSERT IGNORE sobre una clave
+    duplicada deja un bloqueo compartido en el blob hasta el commit, lo que
+    impide que release_texts lo borre mientras esta fila aún no es visible."""
+    if text is None:
+        return None
+    raw = text.encode('utf-8')
+    text_hash = hashlib.sha256(raw).hexdigest()
+
+    dict_id, dictionary = _active_dictionary(cursor, CODEC)
+    data = compress(raw, CODEC, dictionary)
+    codec = CODEC
+    if len(data) >= len(raw):
+        # Textos muy cortos: no vale la pena comprimir
+        data, codec, dict_id = raw, 'none', None
+
+    cursor.execute(
+        "INSERT IGNORE INTO text_blobs (sha256, codec, dict_id, raw_bytes, data) VALUES (%s, %s, %s, %s, %s)",
+        (text_hash, codec, dict_id, len(raw), data)
+    )
+    return text_hash
+
+def _is_referenced(cursor, text_hash):
+    """True si alguna columna <col>_hash apunta al blob. Usa lecturas con
+    bloqueo para ver también filas confirmadas después del inicio de la
+    transacción."""
+    for table_name, columns in TEXT_COLUMNS.items():
+        for column in columns:
+            cursor.execute(
+                f"SELECT 1 FROM {table_name} WHERE {column}_hash = %s LIMIT 1 FOR SHARE",
+                (text_hash,)
+            )
+            if cursor.fetchall():
+                return True
+    return False
+
+def release_texts(cursor, hashes):
+    """Borra los blobs que ya no referencia ninguna fila. Se llama en la misma
+    transacción que el DELETE/UPDATE que dejó de usarlos, para que un resumen
+    borrado (p. ej. por retention_queue) no deje su texto en text_blobs.
+    Retorna cuántos blobs se borraron."""
+    released = 0
+    for text_hash in {h for h in hashes if h}:
+        cursor.execute("SELECT 1 FROM text_blobs WHERE sha256 = %s FOR UPDATE", (text_hash,))
+        if not cursor.fetchall() or _is_referenced(cursor, text_hash):
+            continue
+        cursor.execute("DELETE FROM text_blobs WHERE sha256 = %s", (text_hash,))
+        released += 1
+    return released
+
+def collect_orphan_blobs(cursor, after='', batch_size=1000):
+    """Barrido de blobs sin referencias (p. ej. filas borradas fuera de la API),
+    en orden de sha256 a partir de `after`. Retorna (blobs borrados, último
+    sha256 revisado o None si ya no quedan)."""
+    referenced = " AND ".join(
+        f"NOT EXISTS (SELECT 1 FROM {table_name} t WHERE t.{column}_hash = b.sha256)"
+        for table_name, columns in TEXT_COLUMNS.items() for column in columns
+    )
+    cursor.execute(
+        f"SELECT b.sha256 FROM text_blobs b WHERE b.sha256 > %s AND {referenced} ORDER BY b.sha256 LIMIT %s",
+        (after, batch_size)
+    )
+    candidates = [r['sha256'] if isinstance(r, dict) else r[0] for r in cursor.fetchall()]
+    if not candidates:
+        return 0, None
+    # release_texts vuelve a comprobar cada blob con bloqueo antes de borrarlo
+    return release_texts(cursor, candidates), candidates[-1]
+
+def get_texts(cursor, hashes):
+    """Descomprime los blobs indicados. Retorna {sha256: texto}."""
+    hashes = list({h for h in hashes if h})
+    if not hashes:
+        return {}
+    placeholders = ", ".join(["%s"] * len(hashes))
+    cursor.execute(
+        f"SELECT sha256, codec, dict_id, data FROM text_blobs WHERE sha256 IN ({placeholders})",
+        tuple(hashes)
+    )
+    blobs = [
+        (r['sha256'], r['codec'], r['dict_id'], r['data']) if isinstance(r, dict) else r
+        for r in cursor.fetchall()
+    ]
+    texts = {}
+    for text_hash, codec, dict_id, data in blobs:
+        dictionary = _get_dictionary(cursor, dict_id) if dict_id else None
+        texts[text_hash] = decompress(bytes(data), codec, dictionary).decode('utf-8')
+    return texts
+
+# ----------------------------------------------------------------------
+# Integración con las filas de pages/items/summaries
+# ----------------------------------------------------------------------
+
+def hash_columns(table_name, columns=None):
+    """Columnas <col>_hash de la tabla (solo las de `columns` si se indica).
+    En modo 'inline' retorna [], ya que el esquema original no las tiene."""
+    if TEXT_STORAGE_MODE != 'compressed':
+        return []
+    return [f"{c}_hash" for c in TEXT_COLUMNS.get(table_name, []) if columns is None or c in columns]
+
+def store_columns(cursor, table_name, row):
+    """Prepara las columnas de texto de una fila antes del INSERT/UPDATE.
+
+    En modo 'compressed' reemplaza cada columna de texto por None y agrega
+    <col>_hash. En modo 'inline' retorna la fila sin cambios."""
+    if TEXT_STORAGE_MODE != 'compressed':
+        return dict(row)
+    stored = dict(row)
+    hashes = {}  # tsv suele repetir el texto: se guarda una vez por fila
+    for column in TEXT_COLUMNS.get(table_name, []):
+        if column in stored:
+            text = stored[column]
+            if text not in hashes:
+                hashes[text] = put_text(cursor, text)
+            stored[f"{column}_hash"] = hashes[text]
+            stored[column] = None
+    return stored
+
+def load_texts(cursor, table_name, rows, fields=None):
+    """Completa en las filas las columnas de texto guardadas en text_blobs.
+
+    Solo descomprime las columnas incluidas en `fields` (todas si es None),
+    así las consultas que no piden el texto no pagan la descompresión.
+    Elimina de la salida las columnas <col>_hash."""
+    columns = [c for c in TEXT_COLUMNS.get(table_name, []) if fields is None or c in fields]
+    wanted = [
+        row.get(f"{c}_hash")
+        for row in rows for c in columns
+        if row.get(c) is None and row.get(f"{c}_hash")
+    ]
+    texts = get_texts(cursor, wanted)
+
+    for row in rows:
+        for column in TEXT_COLUMNS.get(table_name, []):
+            text_hash = row.pop(f"{column}_hash", None)
+            if column in columns and row.get(column) is None and text_hash:
+                row[column] = texts.get(text_hash)
+    return rows